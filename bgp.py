@@ -1,9 +1,24 @@
 #!/usr/bin/env python3
 """A Border-Gateway Protocol Router Implementation."""
+
 from __future__ import annotations
 
+import socket
+import struct
+import sys
+from array import array
+from collections.abc import Callable, Iterable, Iterator
 from enum import Enum, auto
-from typing import Iterator, Optional, Tuple, Union
+from functools import partial
+from typing import ClassVar, Optional, Tuple, Union
+
+# Network byte-order (big-endian), unsigned 32-bit integer
+_U32 = struct.Struct(">I")
+# Array type-code holding an unsigned 32-bit integer on this platform
+_U32_TYPECODE = "I" if array("I").itemsize == 4 else "L"
+_inet_pton4 = partial(socket.inet_pton, socket.AF_INET)
+# Decimal representation of every possible octet
+_OCTET_STRS = tuple(str(octet) for octet in range(256))
 
 
 class IpAddr:
@@ -21,16 +36,46 @@ class IpAddr:
         self.num = num
 
     @classmethod
-    def from_octets(cls, octets: list[int]) -> IpAddr:
+    def from_octets(cls, octets: Union[list[int], bytes]) -> IpAddr:
         """Creates an Ip Address object from a collection of four-octets."""
-        val = int.from_bytes(octets, "big", signed=False)
-        return cls(val)
+        if isinstance(octets, (bytes, bytearray)):
+            try:
+                (val,) = _U32.unpack(octets)
+            except struct.error as err:
+                raise ValueError("Can only store a value with 4-bytes!") from err
+            return cls(val)
+        # Unpacking raises `ValueError` for anything other than four octets
+        a, b, c, d = octets
+        if (a | b | c | d) & ~0xFF:
+            raise ValueError("Each octet must be a single byte!")
+        return cls((a << 24) | (b << 16) | (c << 8) | d)
 
     @classmethod
     def from_str(cls, text: str) -> IpAddr:
-        """Creates an Ip Address object from the provided dotted-decimal string representation."""
-        byte_buf = [int(x) for x in text.split(".")]
-        return cls.from_octets(byte_buf)
+        """Creates an Ip Address object from the provided dotted-decimal string representation.
+        NOTE: exactly four decimal octets are required, without leading zeros or whitespace.
+        """
+        try:
+            packed = _inet_pton4(text)
+        except OSError as err:
+            raise ValueError(f"Not a dotted-decimal address: {text!r}") from err
+        (val,) = _U32.unpack(packed)
+        return cls(val)
+
+    @staticmethod
+    def from_strs(texts: Iterable[str]) -> array:
+        """Parses many dotted-decimal strings at once into a packed array of 32-bit integers.
+        Suited to bulk-loading route tables, where one object per address would be wasteful.
+        """
+        try:
+            packed = b"".join(map(_inet_pton4, texts))
+        except OSError as err:
+            raise ValueError("Not a sequence of dotted-decimal addresses!") from err
+        nums = array(_U32_TYPECODE)
+        nums.frombytes(packed)
+        if sys.byteorder == "little":
+            nums.byteswap()
+        return nums
 
     def __int__(self) -> int:
         """The numerical, integer representation of this address object."""
@@ -38,17 +83,25 @@ class IpAddr:
 
     def octets(self) -> bytes:
         """Gets an array of four-bytes, representing the octets of this ip address."""
-        return int(self).to_bytes(4, "big", signed=False)
+        return _U32.pack(self.num)
 
     def __str__(self) -> str:
-        return ".".join(str(octet) for octet in self.octets())
+        num = self.num
+        return (
+            f"{_OCTET_STRS[num >> 24]}.{_OCTET_STRS[(num >> 16) & 0xFF]}."
+            f"{_OCTET_STRS[(num >> 8) & 0xFF]}.{_OCTET_STRS[num & 0xFF]}"
+        )
 
     def __eq__(self, other) -> bool:
-        if isinstance(other, IpAddr):
-            return int(self) == int(other)
-        if isinstance(other, int):
-            return int(self) == other
-        return False
+        # Exact type checks are cheaper than `isinstance`, for these leaf classes
+        if type(other) is IpAddr:
+            return self.num == other.num
+        if type(other) is int:
+            return self.num == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self.num)
 
     def __lt__(self, other: IpAddr) -> bool:
         return int(self) < int(other)
@@ -57,20 +110,21 @@ class IpAddr:
         return int(self) > int(other)
 
     def __and__(self, other: Union[IpAddr, int]) -> IpAddr:
-        if isinstance(other, IpAddr):
-            return IpAddr(int(self) & int(other))
-        return IpAddr(int(self) & other)
+        if type(other) is IpAddr:
+            return IpAddr(self.num & other.num)
+        if type(other) is int:
+            return IpAddr(self.num & other)
+        return NotImplemented
 
     def __lshift__(self, amt: int) -> IpAddr:
-        new_num = int(self) << amt
-        return IpAddr(new_num % IpAddr.MAX_NUM)
+        # Bits shifted beyond the fourth byte are discarded
+        return IpAddr((self.num << amt) & IpAddr.MAX_NUM)
 
     def __rshift__(self, amt: int) -> IpAddr:
-        new_num = int(self) >> amt
-        return IpAddr(new_num)
+        return IpAddr(self.num >> amt)
 
     def __invert__(self) -> IpAddr:
-        return IpAddr(~int(self))
+        return IpAddr(~self.num & IpAddr.MAX_NUM)
 
     def __bytes__(self) -> bytes:
         return self.octets()
@@ -91,6 +145,36 @@ class IpAddr:
         return cls.from_octets([255, 255, 255, 255])
 
 
+class IpAddrArray:
+    """A packed collection of Ip Addresses, stored as 32-bit integers rather than objects."""
+
+    __slots__ = ["nums"]
+
+    def __init__(self, nums: Iterable[int] = ()):
+        self.nums = array(_U32_TYPECODE, nums)
+
+    def __len__(self) -> int:
+        return len(self.nums)
+
+    def __getitem__(self, idx: Union[int, slice]) -> Union[IpAddr, IpAddrArray]:
+        if type(idx) is slice:
+            return IpAddrArray(self.nums[idx])
+        return IpAddr(self.nums[idx])
+
+    def __iter__(self) -> Iterator[IpAddr]:
+        return map(IpAddr, self.nums)
+
+    def mask(self, mask: IpMask) -> IpAddrArray:
+        """Applies the address-mask to every address in this collection."""
+        mask_int = mask.mask_int
+        return IpAddrArray(num & mask_int for num in self.nums)
+
+    def contains_in(self, net: IpNet) -> list[bool]:
+        """Determines, for each address in this collection, whether it is contained within
+        the provided network."""
+        return net.contains_many(self.nums)
+
+
 class IpMask:
     """Encapsulates a mask, which may be applied to an address in order to determine
     inclusion in a network."""
@@ -98,42 +182,58 @@ class IpMask:
     MAX_NUM = 32
     MIN_NUM = 0
 
-    __slots__ = ["_num_network_bits"]
+    __slots__ = ["_num_network_bits", "_mask_int"]
 
-    def __init__(self, num_network_bits: int):
-        self.num_network_bits = num_network_bits
+    # There are only 33 possible masks, so each is created once and shared
+    _pool: ClassVar[dict[int, IpMask]] = {}
+
+    def __new__(cls, num_network_bits: int) -> IpMask:
+        inst = cls._pool.get(num_network_bits)
+        if inst is None:
+            if not IpMask.MIN_NUM <= num_network_bits <= IpMask.MAX_NUM:
+                raise ValueError("Can only create a mask composed of 32-bits!")
+            inst = super().__new__(cls)
+            inst._num_network_bits = num_network_bits
+            inst._mask_int = _MASK_INTS[num_network_bits]
+            # `setdefault` is atomic, so racing threads all share the first instance
+            inst = cls._pool.setdefault(num_network_bits, inst)
+        return inst
+
+    def __reduce__(self):
+        # Copies and unpickled masks are resolved back to the shared instance
+        return (IpMask, (self._num_network_bits,))
 
     @property
     def num_network_bits(self) -> int:
         """The number of **prefix** network bits in any address applied to this mask."""
         return self._num_network_bits
 
-    @num_network_bits.setter
-    def num_network_bits(self, val: int):
-        if not IpMask.MIN_NUM <= val <= IpMask.MAX_NUM:
-            raise ValueError("Can only create a mask composed of 32-bits!")
-        self._num_network_bits = val
-
     @property
     def num_host_bits(self) -> int:
         """The number of **suffix** host-identifier bits in any address applied to this mask."""
         return IpMask.MAX_NUM - self.num_network_bits
 
+    @property
+    def mask_int(self) -> int:
+        """The integer form of this mask, which may be bit-and'ed to some host address."""
+        return self._mask_int
+
     def as_addr(self) -> IpAddr:
         """Converts this mask into an Ip Address object,
         which may be bit-and'ed to some host address."""
-        num = (IpAddr.MAX_NUM << self.num_host_bits) % IpAddr.MAX_NUM
-        return IpAddr(num)
+        return _MASK_ADDRS[self.num_network_bits]
 
     def apply(self, addr: IpAddr) -> IpAddr:
         """Applies this address-mask to the base address.
         Used in conjunction with some base-address, a network may be sub-divided."""
-        mask = self.as_addr()
-        masked_addr = int(mask) & int(addr)
-        return IpAddr(masked_addr)
+        return IpAddr(int(addr) & self._mask_int)
 
     def __eq__(self, other: IpMask) -> bool:
-        return self.num_network_bits == other.num_network_bits
+        # Masks are interned, so equal masks are the same object
+        return self is other
+
+    def __hash__(self) -> int:
+        return hash(self.num_network_bits)
 
     def __int__(self) -> int:
         return self.num_network_bits
@@ -146,14 +246,30 @@ class IpMask:
         return self << -amt
 
 
+# Every possible mask, indexed by its number of network bits
+_MASK_INTS = tuple(
+    (IpAddr.MAX_NUM << (IpMask.MAX_NUM - n)) & IpAddr.MAX_NUM
+    for n in range(IpMask.MIN_NUM, IpMask.MAX_NUM + 1)
+)
+_MASK_ADDRS = tuple(IpAddr(num) for num in _MASK_INTS)
+# Create every mask up-front, so that lookups never need to populate the pool
+for _num_network_bits in range(IpMask.MIN_NUM, IpMask.MAX_NUM + 1):
+    IpMask(_num_network_bits)
+del _num_network_bits
+
+
 class IpNet:
     """An Ip Network; a collection of hosts identified by Ip Addresses."""
 
-    __slots__ = ["_base", "_mask"]
+    __slots__ = ["_mask", "_mask_int", "_base_int", "_num_hosts", "_max_int"]
 
     def __init__(self, base: IpAddr, mask: IpMask):
-        self._base = base
         self._mask = mask
+        # Networks are immutable, so cache the integer forms used by every query
+        self._mask_int = mask.mask_int
+        self._base_int = int(base) & self._mask_int
+        self._num_hosts = 1 << mask.num_host_bits
+        self._max_int = self._base_int + self._num_hosts - 1
 
     @property
     def mask(self) -> IpMask:
@@ -163,24 +279,41 @@ class IpNet:
     @property
     def addr(self) -> IpAddr:
         """The base Ip Address associated with this network."""
-        return self.mask.apply(self._base)
+        return IpAddr(self._base_int)
 
     def min_addr(self) -> IpAddr:
         """Getter for the minimum (numerically) ip address within this network space."""
-        return self.addr
+        return IpAddr(self._base_int)
 
     def max_addr(self) -> IpAddr:
         """Getter for the maximum (numerically) ip address within this network space."""
-        return IpAddr(int(self.min_addr()) + self.num_hosts() - 1)
+        return IpAddr(self._max_int)
 
     def num_hosts(self) -> int:
         """Getter for the number of unique addresses within this network."""
-        return pow(2, self.mask.num_host_bits)
+        return self._num_hosts
 
-    def contains(self, addr: IpAddr) -> bool:
+    def contains(self, addr: Union[IpAddr, int]) -> bool:
         """Determines whether the host identified by the provided address
-        is contained within this network."""
-        return self.addr == self.mask.apply(addr)
+        (or its integer representation) is contained within this network."""
+        return (int(addr) & self._mask_int) == self._base_int
+
+    def compile_contains(self) -> Callable[[int], bool]:
+        """Creates a standalone test of whether an integer address is contained within
+        this network, for repeatedly testing many addresses against a fixed network."""
+        mask_int, base_int = self._mask_int, self._base_int
+
+        # Bound as defaults, so both are fast local lookups rather than attribute loads
+        def contains(num: int, mask_int=mask_int, base_int=base_int) -> bool:
+            return (num & mask_int) == base_int
+
+        return contains
+
+    def contains_many(self, nums: Iterable[int]) -> list[bool]:
+        """Determines, for each of the provided integer addresses,
+        whether it is contained within this network."""
+        mask_int, base_int = self._mask_int, self._base_int
+        return [(num & mask_int) == base_int for num in nums]
 
     def is_adjacent(self, other: IpNet) -> bool:
         """Tests whether the supplied network is adjacent, but NOT the same as this network."""
@@ -197,7 +330,12 @@ class IpNet:
     def get_subnets(self) -> Tuple[IpNet, IpNet]:
         """Getter for the two subnets directly descended from this network."""
         new_mask = IpMask(self.mask.num_network_bits + 1)
-        return (IpNet(IpAddr(0), new_mask), IpNet(IpAddr(0), new_mask))
+        # The upper subnet sets the highest host bit of this network
+        half = self._num_hosts >> 1
+        return (
+            IpNet(IpAddr(self._base_int), new_mask),
+            IpNet(IpAddr(self._base_int + half), new_mask),
+        )
 
     def get_supernet(self) -> IpNet:
         """Getter for the supernet which is a direct parent of this network."""
@@ -218,7 +356,12 @@ class IpNet:
         return other.is_supernet(self)
 
     def __eq__(self, other: IpNet) -> bool:
-        return self.addr == other.addr and self.mask == other.mask
+        if type(other) is not IpNet:
+            return NotImplemented
+        return self._base_int == other._base_int and self._mask_int == other._mask_int
+
+    def __hash__(self) -> int:
+        return hash((self._base_int, self._mask_int))
 
     def __str__(self) -> str:
         return f"{str(self.addr)}/{self.mask.num_network_bits}"
@@ -228,10 +371,12 @@ class IpNet:
         return self.num_hosts()
 
     def __iter__(self) -> Iterator[IpAddr]:
-        curr = int(self.min_addr())
-        while curr <= self.max_addr():
-            yield IpAddr(curr)
-            curr += 1
+        for num in range(self._base_int, self._max_int + 1):
+            yield IpAddr(num)
+
+    def as_array(self) -> IpAddrArray:
+        """Gets every address within this network, packed as integers."""
+        return IpAddrArray(range(self._base_int, self._max_int + 1))
 
     def __lshift__(self, amt: int) -> IpNet:
         return IpNet(self.addr, self.mask << amt)
@@ -240,6 +385,48 @@ class IpNet:
         return IpNet(self.addr, self.mask >> amt)
 
 
+class NetSet:
+    """A collection of Ip Networks, supporting longest-prefix-match lookup of addresses."""
+
+    __slots__ = ["_nets_by_len", "_lens"]
+
+    def __init__(self, nets: Iterable[IpNet] = ()):
+        # Networks keyed by their base address, grouped by number of network bits
+        self._nets_by_len: dict[int, dict[int, IpNet]] = {}
+        # Distinct numbers of network bits in use, most-specific first
+        self._lens: list[int] = []
+        for net in nets:
+            self.add(net)
+
+    def add(self, net: IpNet):
+        """Adds the network to this set, replacing any equivalent network already present."""
+        num_network_bits = net.mask.num_network_bits
+        nets = self._nets_by_len.get(num_network_bits)
+        if nets is None:
+            nets = self._nets_by_len[num_network_bits] = {}
+            self._lens = sorted(self._nets_by_len, reverse=True)
+        nets[net._base_int] = net
+
+    def lookup(self, addr: IpAddr) -> Optional[IpNet]:
+        """Getter for the most-specific network containing the provided address.
+        NOTE: if no network in this set contains the address, `None` will be returned.
+        """
+        num = int(addr)
+        for num_network_bits in self._lens:
+            nets = self._nets_by_len[num_network_bits]
+            net = nets.get(num & _MASK_INTS[num_network_bits])
+            if net is not None:
+                return net
+        return None
+
+    def __len__(self) -> int:
+        return sum(len(nets) for nets in self._nets_by_len.values())
+
+    def __iter__(self) -> Iterator[IpNet]:
+        for num_network_bits in self._lens:
+            yield from self._nets_by_len[num_network_bits].values()
+
+
 class NetClass(Enum):
     """An obselete format of Ip-class versioning, predating CIDR subnetting.
 
@@ -259,36 +446,40 @@ class NetClass(Enum):
 
     def get_mask(self) -> Optional[IpMask]:
         """Getter for the subnet mask associated with this address class.
-        NOTE: for classes D and E, there is no associated mask, and `None` will be returned."""
-        if self == NetClass.A:
-            return IpMask(8)
-        if self == NetClass.B:
-            return IpMask(16)
-        if self == NetClass.C:
-            return IpMask(24)
-        return None
+        NOTE: for classes D and E, there is no associated mask, and `None` will be returned.
+        """
+        num_network_bits = _NETWORK_BITS_BY_CLASS.get(self)
+        if num_network_bits is None:
+            return None
+        return IpMask(num_network_bits)
 
     @staticmethod
     def from_addr(addr: IpAddr) -> NetClass:
         """Getter for the network class, determined by the first octet of the address."""
-        octet, _, _, _ = addr.octets()
-        if 0 <= octet <= 127:
-            return NetClass.A
-        if 128 <= octet <= 191:
-            return NetClass.B
-        if 192 <= octet <= 223:
-            return NetClass.C
-        if 224 <= octet <= 239:
-            return NetClass.D
-        return NetClass.E
+        return _CLASS_BY_OCTET[int(addr) >> 24]
+
+    @staticmethod
+    def from_addrs(nums: Iterable[int]) -> list[NetClass]:
+        """Getter for the network class of each of the provided integer addresses."""
+        return [_CLASS_BY_OCTET[num >> 24] for num in nums]
 
     def __str__(self) -> str:
-        if self == NetClass.A:
-            return "A"
-        if self == NetClass.B:
-            return "B"
-        if self == NetClass.C:
-            return "C"
-        if self == NetClass.D:
-            return "D"
-        return "E"
+        return self.name
+
+
+def _classify_octet(octet: int) -> NetClass:
+    """Determines the network class of an address beginning with the provided octet."""
+    if 0 <= octet <= 127:
+        return NetClass.A
+    if 128 <= octet <= 191:
+        return NetClass.B
+    if 192 <= octet <= 223:
+        return NetClass.C
+    if 224 <= octet <= 239:
+        return NetClass.D
+    return NetClass.E
+
+
+# The network class of every possible first octet
+_CLASS_BY_OCTET = tuple(_classify_octet(octet) for octet in range(256))
+_NETWORK_BITS_BY_CLASS = {NetClass.A: 8, NetClass.B: 16, NetClass.C: 24}
@@ -1,5 +1,11 @@
 #!/usr/bin/env python3
 
+import copy
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
 from bgp import *
 
 zero_ip = IpAddr(IpAddr.MIN_NUM)
@@ -15,7 +21,7 @@ def test_addr_octets():
 
 def test_addr_num():
     assert int(zero_ip) == 0
-    assert int(ones_ip) == pow(2, 32) - 1
+    assert int(ones_ip) == (1 << 32) - 1
 
 
 def test_addr_str():
@@ -26,3 +32,148 @@ def test_addr_str():
 def test_addr_from_str():
     assert zero_ip == IpAddr.from_str(zero_ip_str)
     assert ones_ip == IpAddr.from_str(ones_ip_str)
+
+
+def test_mask_as_addr():
+    assert IpMask(0).as_addr() == zero_ip
+    assert IpMask(24).as_addr() == IpAddr.from_str("255.255.255.0")
+    assert IpMask(32).as_addr() == ones_ip
+
+
+def test_addr_other_types():
+    assert IpAddr(1) != "x"
+    assert (IpAddr(3) & 1) == IpAddr(1)
+    with pytest.raises(TypeError):
+        IpAddr(1) & "x"
+
+
+def test_mask_apply():
+    assert IpMask(24).apply(IpAddr.from_str("10.1.2.3")) == IpAddr.from_str("10.1.2.0")
+    assert IpMask(24).apply(0x0A_01_02_03) == IpAddr.from_str("10.1.2.0")
+
+
+def test_addr_invert():
+    assert ~zero_ip == ones_ip
+    assert ~ones_ip == zero_ip
+
+
+def test_addr_shift():
+    assert IpAddr(1) << 31 == IpAddr(0x80_00_00_00)
+    assert ones_ip << 8 == IpAddr.from_str("255.255.255.0")
+    assert ones_ip >> 24 == IpAddr(0xFF)
+
+
+def test_addr_from_str_malformed():
+    for text in ["10.1", "1.2.3.256", "01.2.3.4", " 1.2.3.4", "a.b.c.d"]:
+        with pytest.raises(ValueError):
+            IpAddr.from_str(text)
+
+
+def test_addr_from_strs():
+    nums = IpAddr.from_strs([zero_ip_str, "10.0.0.1", ones_ip_str])
+    assert list(nums) == [int(zero_ip), 0x0A_00_00_01, int(ones_ip)]
+
+
+def test_addr_array():
+    net = IpNet(IpAddr.from_str("10.0.0.0"), IpMask(30))
+    addrs = IpAddrArray(IpAddr.from_strs(["10.0.0.3", "10.0.0.4"]))
+    assert list(net.as_array()) == list(net)
+    assert addrs.contains_in(net) == [True, False]
+    assert addrs[0] == IpAddr.from_str("10.0.0.3")
+    assert list(addrs[1:]) == [IpAddr.from_str("10.0.0.4")]
+    assert list(addrs.mask(IpMask(30))) == [net.addr, IpAddr.from_str("10.0.0.4")]
+
+
+def test_net_set_lookup():
+    wide = IpNet(IpAddr.from_str("10.0.0.0"), IpMask(8))
+    narrow = IpNet(IpAddr.from_str("10.1.0.0"), IpMask(16))
+    nets = NetSet([wide, narrow])
+    assert nets.lookup(IpAddr.from_str("10.1.2.3")) is narrow
+    assert nets.lookup(IpAddr.from_str("10.2.2.3")) is wide
+    assert nets.lookup(IpAddr.from_str("11.0.0.0")) is None
+
+
+def test_net_class_from_addrs():
+    nums = IpAddr.from_strs(["10.0.0.1", "172.16.0.1", "192.168.0.1", "224.0.0.1"])
+    assert NetClass.from_addrs(nums) == [NetClass.A, NetClass.B, NetClass.C, NetClass.D]
+
+
+def test_net_hash():
+    net = IpNet(IpAddr.from_str("10.0.0.0"), IpMask(8))
+    assert IpNet(IpAddr.from_str("10.1.2.3"), IpMask(8)) in {net}
+    assert IpNet(IpAddr.from_str("10.0.0.0"), IpMask(16)) not in {net}
+    assert net != None
+    assert hash(IpAddr(5)) == hash(5)
+    assert IpMask(8) in {IpMask(8)}
+    assert IpMask(16) not in {IpMask(8)}
+
+
+def test_net_subnets():
+    net = IpNet(IpAddr.from_str("10.0.0.0"), IpMask(8))
+    lower, upper = net.get_subnets()
+    assert str(lower) == "10.0.0.0/9"
+    assert str(upper) == "10.128.0.0/9"
+    assert lower.get_supernet() == upper.get_supernet() == net
+
+
+def test_mask_interned():
+    assert IpMask(24) is IpMask(24)
+    assert IpMask(24) << 8 is IpMask(16)
+    assert copy.copy(IpMask(8)) is IpMask(8)
+    assert pickle.loads(pickle.dumps(IpMask(8))) is IpMask(8)
+    net = IpNet(IpAddr(5), IpMask(8))
+    assert copy.deepcopy(net) == net
+    assert pickle.loads(pickle.dumps(net)).mask is IpMask(8)
+
+
+def test_mask_pool_threaded():
+    pool = dict(IpMask._pool)
+    IpMask._pool.clear()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            masks = list(executor.map(IpMask, [24] * 64))
+        assert all(mask is masks[0] for mask in masks)
+    finally:
+        IpMask._pool.clear()
+        IpMask._pool.update(pool)
+
+
+def test_addr_from_octets():
+    assert IpAddr.from_octets([10, 1, 2, 3]) == IpAddr.from_str("10.1.2.3")
+    assert IpAddr.from_octets(ones_ip.octets()) == ones_ip
+
+
+def test_net_compile_contains():
+    net = IpNet(IpAddr.from_str("10.0.0.0"), IpMask(8))
+    contains = net.compile_contains()
+    assert contains(0x0A_01_02_03)
+    assert not contains(0x0B_00_00_00)
+
+
+def test_net_class():
+    boundaries = [
+        ("127.255.255.255", NetClass.A),
+        ("128.0.0.0", NetClass.B),
+        ("191.255.255.255", NetClass.B),
+        ("192.0.0.0", NetClass.C),
+        ("223.255.255.255", NetClass.C),
+        ("224.0.0.0", NetClass.D),
+        ("239.255.255.255", NetClass.D),
+        ("240.0.0.0", NetClass.E),
+    ]
+    for text, net_class in boundaries:
+        assert NetClass.from_addr(IpAddr.from_str(text)) is net_class
+    assert str(NetClass.A) == "A"
+    assert NetClass.C.get_mask() is IpMask(24)
+    assert NetClass.D.get_mask() is None
+
+
+def test_net_bounds():
+    net = IpNet(IpAddr.from_str("10.1.2.3"), IpMask(24))
+    assert net.addr == net.min_addr() == IpAddr.from_str("10.1.2.0")
+    assert net.max_addr() == IpAddr.from_str("10.1.2.255")
+    assert net.contains(IpAddr.from_str("10.1.2.200"))
+    assert not net.contains(IpAddr.from_str("10.1.3.0"))
+    assert net.contains(0x0A_01_02_07)
+    assert len(net) == net.num_hosts() == 256
+    assert list(net)[-1] == net.max_addr()